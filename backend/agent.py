@@ -1,24 +1,110 @@
+from __future__ import annotations
+
 from dataclasses import dataclass, field
-from typing import Dict, Any, List, Optional
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
 import json
 import re
-import google.generativeai as genai
-from google.protobuf.json_format import MessageToDict
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage, ToolMessage
-from langgraph.graph import StateGraph, START, END
+import threading
+from .cassette import attribute_view, cassette_session, get_cassette
 from .config import Config
-from .tools import ExaResearcher
+from .deadline import Deadline, DeadlineExceeded, is_timeout_error
+from .history import CompactHistory
+from .routing import ModelRouter
+from .speculation import SpeculativeResearch
+
+# Heavy SDKs (google-generativeai, protobuf, langchain_core, langgraph) are
+# imported on first use so that importing the backend stays cheap.
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage, AIMessage
+    from langgraph.graph.state import CompiledStateGraph
+    from .tools import ExaResearcher
+
+_genai = None
+_llms: Dict[str, "GeminiLLM"] = {}
+_researcher: Optional["ExaResearcher"] = None
+_clients_lock = threading.Lock()
+
+
+def load_genai():
+    """Imports and configures the Gemini SDK once, on first use"""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+
+        genai.configure(api_key=Config.GEMINI_API_KEY)
+        _genai = genai
+    return _genai
 
-# Configure Gemini
-genai.configure(api_key=Config.GEMINI_API_KEY)
 
 @dataclass
 class AgentState:
     """Manages conversation state with messages and page context"""
-    messages: List[BaseMessage] = field(default_factory=list)
+    messages: List[Any] = field(default_factory=list)  # langchain_core BaseMessage instances
     page_content: str = ""
     page_details: Dict[str, Any] = field(default_factory=dict)
     current_tool: Optional[str] = None
+    # Compact at-rest form of messages and page context between turns
+    history: CompactHistory = field(default_factory=CompactHistory)
+
+    def materialize(self) -> None:
+        """Expands the compact history into LangChain messages for a graph run"""
+        self.restore_page()
+        if len(self.history):
+            self.messages = self.history.to_messages() + self.messages
+            self.history = CompactHistory()
+
+    def compact(self) -> None:
+        """Moves messages and page context into the compact history"""
+        persistent = [
+            message
+            for message in self.messages
+            if not (
+                getattr(message, "type", "") == "system"
+                and (
+                    message.additional_kwargs.get(INSTRUCTION_METADATA_KEY)
+                    or message.additional_kwargs.get(CONTEXT_METADATA_KEY)
+                )
+            )
+        ]
+        self.history.append_messages(persistent)
+        self.messages = []
+        if Config.HISTORY_COMPRESSION and not self.history.has_packed_page:
+            self.history.pack_page(self.page_content, self.page_details)
+            self.page_content = ""
+            self.page_details = {}
+
+    def restore_page(self) -> None:
+        packed = self.history.unpack_page()
+        if packed is not None:
+            self.page_content, self.page_details = packed
+
+    def update_page(self, **fields: Any) -> None:
+        """Sets page_content and/or page_details, unpacking stored page context first"""
+        self.restore_page()
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def message_count(self) -> int:
+        return len(self.history) + len(self.messages)
+
+    def page_length(self) -> int:
+        return self.history.page_length if self.history.has_packed_page else len(self.page_content)
+
+    def has_page_details(self) -> bool:
+        return self.history.has_page_details if self.history.has_packed_page else bool(self.page_details)
+
+    def last_response(self) -> str:
+        """Returns the text of the last message in the conversation"""
+        from langchain_core.messages import BaseMessage
+
+        if not self.messages:
+            return self.history.last_text() or "No response generated"
+        last_message = self.messages[-1]
+        if isinstance(last_message, BaseMessage):
+            return getattr(last_message, "content", "") or ""
+        elif isinstance(last_message, dict):
+            return last_message.get('content', '')
+        return str(last_message)
 
 GEMINI_TOOLS = [
     {
@@ -46,6 +132,13 @@ GEMINI_TOOLS = [
 ]
 
 INSTRUCTION_METADATA_KEY = "__instruction_message__"
+CONTEXT_METADATA_KEY = "__context_message__"
+
+BUDGET_EXHAUSTED_NOTE = (
+    "Лимит времени или числа обращений к инструментам для этого ответа исчерпан. "
+    "Не вызывай инструменты: ответь пользователю, опираясь на уже полученные данные, "
+    "и кратко укажи, если ответ может быть неполным."
+)
 
 
 def clean_markdown(text: str) -> str:
@@ -69,6 +162,8 @@ def clean_markdown(text: str) -> str:
 
 def ensure_instruction_message(state: "AgentState") -> None:
     """Вставляет системную инструкцию для модели, если её ещё нет."""
+    from langchain_core.messages import SystemMessage
+
     has_instruction = any(
         isinstance(message, SystemMessage)
         and message.additional_kwargs.get(INSTRUCTION_METADATA_KEY)
@@ -100,11 +195,14 @@ class GeminiLLM:
     """Gemini LLM wrapper with tool calling support"""
 
     def __init__(self, model_name: str = "gemini-2.5-flash", temperature: float = 0.7):
-        self.model = genai.GenerativeModel(model_name)
+        self.model = load_genai().GenerativeModel(model_name)
+        self.model_name = model_name
         self.temperature = temperature
 
     def _get_mock_response(self, messages: List[BaseMessage]) -> AIMessage:
         """Возвращает mock ответ для тестирования без API ключей"""
+        from langchain_core.messages import HumanMessage, AIMessage
+
         # Получаем последнее сообщение пользователя
         last_user_msg = None
         for msg in reversed(messages):
@@ -139,10 +237,21 @@ class GeminiLLM:
 
         return AIMessage(content=response_text)
 
-    def invoke(self, messages: List[BaseMessage]) -> AIMessage:
+    def invoke(
+        self,
+        messages: List[BaseMessage],
+        temperature: Optional[float] = None,
+        timeout: Optional[float] = None,
+        use_tools: bool = True,
+    ) -> AIMessage:
         """Process messages and return AI response"""
+        from google.protobuf.json_format import MessageToDict
+        from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
+
+        cassette = get_cassette()
+
         # Если API ключ не установлен, возвращаем mock ответ
-        if not Config.GEMINI_API_KEY:
+        if not Config.GEMINI_API_KEY and not (cassette and cassette.replaying):
             return self._get_mock_response(messages)
 
         contents: List[Dict[str, Any]] = []
@@ -207,12 +316,29 @@ class GeminiLLM:
         except Exception:
             pass
 
+        generation_config = {"temperature": self.temperature if temperature is None else temperature}
+        request_options = {"timeout": timeout} if timeout else None
         try:
-            response = self.model.generate_content(
-                contents=contents,
-                tools=GEMINI_TOOLS,
-                generation_config={"temperature": self.temperature}
-            )
+            if cassette:
+                response = cassette.call(
+                    "gemini",
+                    {"model": self.model_name, "contents": contents, "generation_config": generation_config},
+                    perform=lambda: self.model.generate_content(
+                        contents=contents,
+                        tools=GEMINI_TOOLS if use_tools else None,
+                        generation_config=generation_config,
+                        request_options=request_options,
+                    ),
+                    encode=lambda result: result.to_dict(),
+                    decode=attribute_view,
+                )
+            else:
+                response = self.model.generate_content(
+                    contents=contents,
+                    tools=GEMINI_TOOLS if use_tools else None,
+                    generation_config=generation_config,
+                    request_options=request_options,
+                )
         except Exception as exc:
             import traceback
 
@@ -221,7 +347,8 @@ class GeminiLLM:
             if "API_KEY" in str(exc) or "authentication" in str(exc).lower():
                 print("[GeminiLLM] API key issue detected, falling back to mock response")
                 return self._get_mock_response(messages)
-            traceback.print_exc()
+            if not is_timeout_error(exc):
+                traceback.print_exc()
             raise
 
         try:
@@ -279,21 +406,79 @@ class GeminiLLM:
         # Clean any remaining Markdown formatting
         response_text = clean_markdown(response_text)
 
+        usage_metadata = None
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            input_tokens = getattr(usage, "prompt_token_count", 0) or 0
+            output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+            usage_metadata = {
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": getattr(usage, "total_token_count", 0) or input_tokens + output_tokens,
+            }
+
         return AIMessage(
             content=response_text,
-            tool_calls=tool_calls
+            tool_calls=tool_calls,
+            usage_metadata=usage_metadata,
         )
 
 
-def create_agent() -> StateGraph:
+def get_llm(model_name: str) -> GeminiLLM:
+    """Returns the shared GeminiLLM for ``model_name``, creating it on first use"""
+    with _clients_lock:
+        if model_name not in _llms:
+            _llms[model_name] = GeminiLLM(model_name=model_name)
+        return _llms[model_name]
+
+
+def get_researcher() -> ExaResearcher:
+    """Returns the shared ExaResearcher, whose requests.Session keeps connections alive across turns"""
+    global _researcher
+    with _clients_lock:
+        if _researcher is None:
+            from .tools import ExaResearcher
+
+            _researcher = ExaResearcher()
+        return _researcher
+
+
+def degraded_answer(messages: List[BaseMessage]) -> str:
+    """Builds a reply from what the current turn already gathered, without calling the LLM"""
+    turn: List[BaseMessage] = []
+    for message in reversed(messages):
+        if getattr(message, "type", "") == "human":
+            break
+        turn.insert(0, message)
+
+    partial = [str(message.content) for message in turn if getattr(message, "type", "") == "ai" and message.content]
+    findings = [str(message.content) for message in turn if getattr(message, "type", "") == "tool"]
+
+    parts = ["Не успел полностью подготовить ответ в отведённое время."]
+    if partial:
+        parts.append(clean_markdown(partial[-1]))
+    if findings:
+        parts.append("Вот что удалось найти: " + clean_markdown(findings[-1])[:2000])
+    return " ".join(parts)
+
+
+def create_agent(deadline: Optional[Deadline] = None) -> CompiledStateGraph:
     """Creates LangGraph agent with Gemini and tools"""
-    llm = GeminiLLM(model_name=Config.GEMINI_MODEL, temperature=0.7)
+    from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
+    from langgraph.graph import StateGraph, START, END
+
+    deadline = deadline or Deadline()
+    tool_iterations = 0
+
+    if Config.MODEL_ROUTING:
+        llm = ModelRouter()
+    else:
+        llm = get_llm(Config.GEMINI_MODEL)
 
     # Define tools
-    tools = [ExaResearcher()]
+    tools = [get_researcher()]
     tool_map = {tool.name: tool for tool in tools}
-
-    CONTEXT_METADATA_KEY = "__context_message__"
+    speculation = SpeculativeResearch(tool_map["exa_researcher"]) if Config.EXA_SPECULATIVE else None
 
     def update_context_message(state: AgentState) -> None:
         """Ensure system context message reflects latest page content details"""
@@ -372,13 +557,27 @@ def create_agent() -> StateGraph:
                 print(f"  [{idx}] {type(msg).__name__}: {getattr(msg, 'content', '')}")
         except Exception:
             pass
-        response = llm.invoke(state.messages)
+        last_message = state.messages[-1] if state.messages else None
+        if speculation and isinstance(last_message, HumanMessage) and not deadline.expired():
+            speculation.start(str(last_message.content), timeout=deadline.timeout(Config.EXA_TIMEOUT))
+
+        try:
+            response = llm.invoke(state.messages, timeout=deadline.timeout(Config.GEMINI_TIMEOUT))
+        except Exception as exc:
+            if not (isinstance(exc, DeadlineExceeded) or is_timeout_error(exc)):
+                raise
+            print(f"[LangGraph] LLM call ran out of time: {exc}")
+            response = AIMessage(content=degraded_answer(state.messages))
+        if speculation and not any(call.get("name") == "exa_researcher" for call in response.tool_calls or []):
+            speculation.discard()
         state.messages.append(response)
         print("[LangGraph] Agent node appended AIMessage with tool_calls:", getattr(response, 'tool_calls', None))
         return state
 
     def tool_node(state: AgentState) -> AgentState:
         """Tool execution node"""
+        nonlocal tool_iterations
+        tool_iterations += 1
         last_message = state.messages[-1]
         if isinstance(last_message, AIMessage) and last_message.tool_calls:
             for tool_call in last_message.tool_calls:
@@ -391,10 +590,17 @@ def create_agent() -> StateGraph:
                     tool = tool_map[tool_name]
                     # Call the appropriate method based on tool
                     if tool_name == "exa_researcher":
-                        result = tool.research(
-                            query=tool_args.get("query", ""),
-                            context=tool_args.get("context", "")
-                        )
+                        try:
+                            timeout = deadline.timeout(Config.EXA_TIMEOUT)
+                            result = speculation.take(tool_args.get("query", ""), timeout=timeout) if speculation else None
+                            if result is None:
+                                result = tool.research(
+                                    query=tool_args.get("query", ""),
+                                    context=tool_args.get("context", ""),
+                                    timeout=deadline.timeout(Config.EXA_TIMEOUT),
+                                )
+                        except DeadlineExceeded as exc:
+                            result = f"Инструмент не вызван: исчерпан лимит времени ({exc})."
                     else:
                         result = f"Unknown tool: {tool_name}"
                 else:
@@ -408,41 +614,103 @@ def create_agent() -> StateGraph:
                 state.messages.append(tool_message)
                 print("[LangGraph] Tool node executed", tool_name, "result preview:", str(result)[:200])
 
+        if speculation:
+            speculation.discard()
         state.current_tool = None
         return state
 
+    def finalize_node(state: AgentState) -> AgentState:
+        """Answers with what is already available once the tool or time budget is spent"""
+        # Unexecuted tool calls would leave the history without matching tool results
+        pending = state.messages.pop()
+        if pending.content:
+            state.messages.append(AIMessage(content=pending.content))
+        print(f"[LangGraph] Budget exhausted after {tool_iterations} tool iterations, "
+              f"{deadline.remaining():.1f}s left; finalizing")
+
+        response = None
+        if not deadline.expired():
+            try:
+                response = llm.invoke(
+                    state.messages + [SystemMessage(content=BUDGET_EXHAUSTED_NOTE)],
+                    timeout=deadline.timeout(Config.GEMINI_TIMEOUT),
+                    use_tools=False,
+                )
+            except Exception as exc:
+                if not (isinstance(exc, DeadlineExceeded) or is_timeout_error(exc)):
+                    raise
+                print(f"[LangGraph] Final LLM call ran out of time: {exc}")
+        if response is None or not response.content:
+            response = AIMessage(content=degraded_answer(state.messages))
+
+        if pending.content:
+            state.messages.pop()
+        state.messages.append(AIMessage(content=response.content, usage_metadata=response.usage_metadata))
+        return state
+
+    def route_after_agent(state: AgentState) -> str:
+        last_message = state.messages[-1]
+        if not (isinstance(last_message, AIMessage) and last_message.tool_calls):
+            return END
+        if tool_iterations >= Config.MAX_TOOL_ITERATIONS or deadline.expired():
+            return "finalize"
+        return "tools"
+
     # Create the graph
     workflow = StateGraph(AgentState)
 
     # Add nodes
     workflow.add_node("agent", agent_node)
     workflow.add_node("tools", tool_node)
+    workflow.add_node("finalize", finalize_node)
 
     # Add edges
     workflow.add_edge(START, "agent")
     workflow.add_conditional_edges(
         "agent",
-        lambda state: "tools" if (isinstance(state.messages[-1], AIMessage) and state.messages[-1].tool_calls) else END,
-        {"tools": "tools", END: END}
+        route_after_agent,
+        {"tools": "tools", "finalize": "finalize", END: END}
     )
     workflow.add_edge("tools", "agent")
+    workflow.add_edge("finalize", END)
 
     return workflow.compile()
 
 
-def process_message(state: AgentState, message: str) -> AgentState:
-    """Processes user messages and updates state"""
-    ensure_instruction_message(state)
+def process_message(
+    state: AgentState,
+    message: str,
+    deadline: Optional[Deadline] = None,
+    session_id: Optional[str] = None,
+) -> AgentState:
+    """Processes user messages and updates state within the turn's time budget.
+
+    ``session_id`` only tags cassette entries, so replays keep sessions apart.
+    """
+    from langchain_core.messages import HumanMessage
 
-    # Add user message to state
-    human_message = HumanMessage(content=message)
-    state.messages.append(human_message)
-    print("[process_message] Added HumanMessage:", message)
+    state.materialize()
+    ensure_instruction_message(state)
 
-    # Process through the agent
-    agent = create_agent()
-    print("[process_message] Invoking agent with", len(state.messages), "messages")
-    result_dict = agent.invoke(state)
+    with cassette_session(session_id):
+        cassette = get_cassette()
+        if cassette and cassette.recording:
+            cassette.record("turn", {
+                "message": message,
+                "page_content": state.page_content,
+                "page_details": state.page_details,
+            })
+
+        # Add user message to state
+        human_message = HumanMessage(content=message)
+        state.messages.append(human_message)
+        print("[process_message] Added HumanMessage:", message)
+
+        # Process through the agent
+        agent = create_agent(deadline or Deadline())
+        print("[process_message] Invoking agent with", len(state.messages), "messages")
+        # Each tool iteration takes two graph steps; finalize and the first agent call add two more
+        result_dict = agent.invoke(state, config={"recursion_limit": 2 * Config.MAX_TOOL_ITERATIONS + 4})
     print("[process_message] Agent returned keys:", list(result_dict.keys()))
 
     # Update state from the result dictionary
@@ -451,4 +719,18 @@ def process_message(state: AgentState, message: str) -> AgentState:
     state.page_details = result_dict.get('page_details', state.page_details)
     state.current_tool = result_dict.get('current_tool', state.current_tool)
 
+    state.compact()
     return state
+
+
+def warm_up() -> None:
+    """Creates the shared Gemini and Exa clients ahead of the first request"""
+    if Config.MODEL_ROUTING:
+        get_llm(Config.GEMINI_FAST_MODEL)
+        get_llm(Config.GEMINI_STRONG_MODEL)
+    else:
+        get_llm(Config.GEMINI_MODEL)
+    get_researcher()
+    # The graph closes over per-turn budgets and is rebuilt every turn; compiling
+    # one here loads the langgraph modules it imports lazily
+    create_agent()
@@ -0,0 +1,100 @@
+"""Transport benchmark: bytes on the wire and CPU per turn for each body encoding.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.compression [--page-chars 20000] [--iterations 200]
+
+The payload mirrors what the extension uploads with every message: the
+summarized page, the full page details with extracted text and forms, and
+a typical assistant response. Text is real prose (see ``corpus``), so the
+ratios are close to those of real pages rather than of repetitive filler.
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+from typing import Callable, Dict, Tuple
+
+from ..compression import StreamingDecompressor, zstandard
+from ..config import Config
+from .corpus import prose
+
+
+def build_payloads(page_chars: int) -> Tuple[bytes, bytes]:
+    rng = random.Random(0)
+    text = prose(rng, page_chars)
+    forms = [
+        {
+            "id": f"form-{index}",
+            "action": "/submit",
+            "fields": [
+                {"name": f"field_{field}", "label": f"Поле {field}", "type": "text"}
+                for field in range(12)
+            ],
+        }
+        for index in range(3)
+    ]
+    request = {
+        "message": "Сравни цены на этой странице с похожими курсами",
+        "page_content": f"Page Title: Курсы\nURL: https://example.com\nContent: {text[:3000]}",
+        "page_details": {"title": "Курсы", "url": "https://example.com", "text": text, "forms": forms},
+    }
+    response = {"response": prose(rng, 1600), "session_id": "s", "current_tool": None}
+    return (
+        json.dumps(request, ensure_ascii=False).encode("utf-8"),
+        json.dumps(response, ensure_ascii=False).encode("utf-8"),
+    )
+
+
+def codecs() -> Dict[str, Tuple[Callable[[bytes], bytes], str]]:
+    result = {
+        "gzip-1": (lambda data: gzip.compress(data, compresslevel=1), "gzip"),
+        f"gzip-{Config.GZIP_LEVEL}": (lambda data: gzip.compress(data, compresslevel=Config.GZIP_LEVEL), "gzip"),
+        "gzip-9": (lambda data: gzip.compress(data, compresslevel=9), "gzip"),
+    }
+    if zstandard is not None:
+        for level in (3, 10):
+            compressor = zstandard.ZstdCompressor(level=level)
+            result[f"zstd-{level}"] = (compressor.compress, "zstd")
+    return result
+
+
+def cpu_ms(action: Callable[[], object], iterations: int) -> float:
+    started = time.process_time()
+    for _ in range(iterations):
+        action()
+    return (time.process_time() - started) * 1000 / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page-chars", type=int, default=20000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    request, response = build_payloads(args.page_chars)
+    print(f"raw: request {len(request):,} bytes, response {len(response):,} bytes per turn")
+    print(f"{'codec':<10} {'request':>10} {'response':>10} {'ratio':>7} {'compress ms':>12} {'server inflate ms':>18}")
+
+    for name, (compress, encoding) in codecs().items():
+        compressed_request = compress(request)
+        compressed_response = compress(response)
+
+        def inflate() -> bytes:
+            decompressor = StreamingDecompressor(encoding, Config.MAX_DECOMPRESSED_BODY)
+            return decompressor.feed(compressed_request) + decompressor.flush()
+
+        assert inflate() == request
+        compress_ms = cpu_ms(lambda: compress(request), args.iterations)
+        inflate_ms = cpu_ms(inflate, args.iterations)
+        total = len(compressed_request) + len(compressed_response)
+        ratio = (len(request) + len(response)) / total
+        print(
+            f"{name:<10} {len(compressed_request):>10,} {len(compressed_response):>10,} "
+            f"{ratio:>6.1f}x {compress_ms:>12.3f} {inflate_ms:>18.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Realistic benchmark text.
+
+Synthetic text from a small vocabulary compresses several times better than
+real page text or Exa results, which inflates any compression figure. The
+benchmarks therefore slice real prose: the English documentation topics that
+ship with CPython in ``pydoc_data`` (~430 KB, compresses ~2.4x with zlib at
+3 KB, comparable to page text).
+"""
+import random
+from typing import List
+
+from pydoc_data.topics import topics
+
+CORPUS = " ".join(" ".join(topics.values()).split())
+
+
+def prose(rng: random.Random, chars: int) -> str:
+    """A contiguous slice of real prose starting at a random offset"""
+    start = rng.randrange(len(CORPUS) - chars)
+    return CORPUS[start:start + chars]
+
+
+def exa_result(rng: random.Random, citations: int = 5) -> str:
+    """Tool output in the format ExaResearcher returns: answer, citations with URLs and snippets"""
+    lines: List[str] = []
+    for index in range(1, citations + 1):
+        title = prose(rng, 60).strip()
+        slug = "-".join(prose(rng, 30).lower().split()[:4])
+        lines.append(
+            f"{index}. {title} — https://www.example{rng.randrange(1000)}.com/{slug}?id={rng.randrange(10 ** 8)}"
+            f"\n    {prose(rng, 280).strip()}"
+        )
+    return (
+        f"Answer:\n{prose(rng, 1200)}\n\nCitations:\n" + "\n".join(lines)
+        + f"\n\nEstimated cost: ${rng.randrange(1, 100) / 1000}"
+    )
@@ -0,0 +1,96 @@
+"""Memory benchmark: bytes per 100-turn session, LangChain messages vs CompactHistory.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.history_memory [--turns 100] [--sessions 20]
+
+Every third turn calls ``exa_researcher`` and stores a large tool result,
+which is what dominates resident size in practice. All text is real prose
+(see ``corpus``), and CompactHistory is measured with and without zlib so
+the saving from the record layout and from compression are reported apart.
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+from typing import Any, Callable, List
+
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+
+from ..agent import AgentState, ensure_instruction_message
+from ..config import Config
+from .corpus import exa_result, prose
+
+
+def build_messages(turns: int, seed: int) -> List[Any]:
+    rng = random.Random(seed)
+    messages: List[Any] = []
+    for turn in range(turns):
+        messages.append(HumanMessage(content=prose(rng, 100)))
+        if turn % 3 == 0:
+            call_id = f"exa_researcher_{turn}"
+            messages.append(AIMessage(
+                content="",
+                tool_calls=[{"id": call_id, "name": "exa_researcher", "args": {"query": prose(rng, 50)}}],
+            ))
+            messages.append(ToolMessage(content=exa_result(rng), tool_call_id=call_id))
+        messages.append(AIMessage(
+            content=prose(rng, 600),
+            usage_metadata={"input_tokens": 1200, "output_tokens": 150, "total_tokens": 1350},
+        ))
+    return messages
+
+
+def build_state(turns: int, seed: int, compact: bool) -> AgentState:
+    rng = random.Random(seed)
+    state = AgentState(
+        page_content=prose(rng, 3500),
+        page_details={"title": "Page", "url": "https://example.com", "text": prose(rng, 5500), "forms": []},
+    )
+    state.messages = build_messages(turns, seed)
+    ensure_instruction_message(state)
+    if compact:
+        state.compact()
+    return state
+
+
+def measure(factory: Callable[[int], AgentState], sessions: int) -> int:
+    """Average traced bytes retained per session"""
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    retained = [factory(index) for index in range(sessions)]
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retained
+    return (current - baseline) // sessions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--sessions", type=int, default=20)
+    args = parser.parse_args()
+
+    # Warm up imports and caches so they are not attributed to the first measurement
+    build_state(args.turns, 0, compact=True).materialize()
+
+    before = measure(lambda index: build_state(args.turns, index, compact=False), args.sessions)
+    compression = Config.HISTORY_COMPRESSION
+    try:
+        Config.HISTORY_COMPRESSION = False
+        uncompressed = measure(lambda index: build_state(args.turns, index, compact=True), args.sessions)
+        Config.HISTORY_COMPRESSION = True
+        compressed = measure(lambda index: build_state(args.turns, index, compact=True), args.sessions)
+    finally:
+        Config.HISTORY_COMPRESSION = compression
+
+    print(f"{args.turns}-turn session of real prose, averaged over {args.sessions} sessions")
+    print(f"  LangChain messages:           {before:>10,} bytes")
+    print(f"  CompactHistory, uncompressed: {uncompressed:>10,} bytes  ({before / uncompressed:.1f}x)")
+    print(f"  CompactHistory, zlib:         {compressed:>10,} bytes  ({before / compressed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Replays recorded conversations through the real agent graph without network access.
+
+Record a cassette by running the backend with CASSETTE_MODE=record (and
+optionally CASSETTE_PATH), then from the repository root:
+
+    python -m backend.benchmarks.replay cassettes/session.jsonl.gz [--speed fast] [--session ID] [--profile out.pstats]
+
+Turns are replayed in recorded order, each against its own session's state,
+and upstream calls are matched only to entries recorded by the same session.
+With ``--speed recorded`` upstream calls take as long as they did when
+recorded; with ``fast`` only local overhead (graph, serialization, context
+building) remains. Requests that no longer match their recording fall back to
+recorded order and are reported, as the replay is then not exact.
+"""
+import argparse
+import cProfile
+import pstats
+import sys
+import time
+from typing import Dict
+
+from ..agent import AgentState, process_message, warm_up
+from ..cassette import Cassette, MODE_REPLAY, SPEED_FAST, SPEED_RECORDED, use_cassette
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cassette")
+    parser.add_argument("--speed", choices=[SPEED_FAST, SPEED_RECORDED], default=SPEED_FAST)
+    parser.add_argument("--session", help="replay only this session's turns")
+    parser.add_argument("--profile", help="write cProfile stats to this file")
+    args = parser.parse_args()
+
+    cassette = Cassette(args.cassette, MODE_REPLAY, args.speed)
+    use_cassette(cassette)
+    turns = [
+        entry for entry in cassette.events("turn")
+        if args.session is None or entry.get("session") == args.session
+    ]
+    # Keep SDK import and client setup out of the per-turn timings
+    warm_up()
+
+    profiler = cProfile.Profile() if args.profile else None
+    states: Dict[str, AgentState] = {}
+    timings = []
+    for entry in turns:
+        turn, session = entry["request"], entry.get("session")
+        state = states.setdefault(session, AgentState())
+        state.update_page(page_content=turn["page_content"], page_details=turn["page_details"])
+        started = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        process_message(state, turn["message"], session_id=session)
+        if profiler:
+            profiler.disable()
+        timings.append(time.perf_counter() - started)
+
+    print(f"Replayed {len(turns)} turns of {len(states)} sessions from {args.cassette} ({args.speed})")
+    for index, (entry, elapsed) in enumerate(zip(turns, timings), start=1):
+        print(f"  turn {index}: {elapsed * 1000:8.1f} ms  [{entry.get('session')}] {entry['request']['message'][:60]}")
+    if timings:
+        print(f"  total: {sum(timings) * 1000:8.1f} ms")
+
+    if profiler:
+        profiler.dump_stats(args.profile)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+    fallbacks = sum(cassette.fallbacks.values())
+    if fallbacks:
+        details = ", ".join(f"{kind}: {count}" for kind, count in sorted(cassette.fallbacks.items()))
+        print(f"WARNING: {fallbacks} requests differed from the recording and were matched by order ({details})")
+    else:
+        print("All upstream requests matched their recording exactly")
+    return 1 if fallbacks else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Offline check of turn classification and escalation in ModelRouter.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.routing_check
+
+Uses stubbed models, so no API keys or network are needed. Exits with
+status 1 if any case is routed differently than expected.
+"""
+import sys
+from typing import List, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from ..routing import (
+    ROUTE_CHIT_CHAT,
+    ROUTE_PAGE,
+    ROUTE_RESEARCH,
+    TIER_FAST,
+    TIER_STRONG,
+    ModelRouter,
+    RoutingMetrics,
+    classify_turn,
+)
+
+CASES = [
+    ("привет", ROUTE_CHIT_CHAT),
+    ("Спасибо большое!", ROUTE_CHIT_CHAT),
+    ("ok, thanks", ROUTE_CHIT_CHAT),
+    ("hello :)", ROUTE_CHIT_CHAT),
+    # Start like chit-chat but ask about the page
+    ("привет, сколько стоит курс на этой странице?", ROUTE_PAGE),
+    ("ок, а какие поля обязательны в форме?", ROUTE_PAGE),
+    # Contain substrings of search keywords but not the words
+    ("I'd like a summary of this page", ROUTE_PAGE),
+    ("Is this product likely to ship soon?", ROUTE_PAGE),
+    ("unlike the first paragraph, what does the second one say?", ROUTE_PAGE),
+    ("what is another word here", ROUTE_PAGE),
+    ("О чём эта статья?", ROUTE_PAGE),
+    ("Найди похожие курсы в интернете", ROUTE_RESEARCH),
+    ("Какие есть альтернативы этой школе?", ROUTE_RESEARCH),
+    ("compare this laptop with similar models", ROUTE_RESEARCH),
+    ("what are the latest news about this company", ROUTE_RESEARCH),
+]
+
+
+class StubModel:
+    """Answers with a fixed text and records which tier was called"""
+
+    def __init__(self, tier: str, content: str, calls: List[str]):
+        self.model_name = tier
+        self.content = content
+        self.calls = calls
+
+    def invoke(self, messages, temperature: Optional[float] = None, **kwargs) -> AIMessage:
+        self.calls.append(self.model_name)
+        return AIMessage(content=self.content)
+
+
+def route(text: str, fast_answer: str, timeout: Optional[float] = None) -> List[str]:
+    calls: List[str] = []
+    router = ModelRouter(
+        models={
+            TIER_FAST: StubModel(TIER_FAST, fast_answer, calls),
+            TIER_STRONG: StubModel(TIER_STRONG, "Ответ.", calls),
+        },
+        metrics=RoutingMetrics(),
+    )
+    router.invoke([HumanMessage(content=text)], timeout=timeout)
+    return calls
+
+
+def main() -> int:
+    failures = []
+    for text, expected in CASES:
+        actual = classify_turn(text)
+        if actual != expected:
+            failures.append(f"classify_turn({text!r}) = {actual}, expected {expected}")
+
+    escalation_cases = [
+        ("О чём эта страница?", "Это страница курса.", None, [TIER_FAST]),
+        ("О чём эта страница?", "Не уверен, что понял вопрос.", None, [TIER_FAST, TIER_STRONG]),
+        # Not enough time left for a second call
+        ("О чём эта страница?", "Не уверен, что понял вопрос.", 0.0, [TIER_FAST]),
+        ("Найди похожие курсы", "", None, [TIER_STRONG]),
+    ]
+    for text, fast_answer, timeout, expected in escalation_cases:
+        actual = route(text, fast_answer, timeout)
+        if actual != expected:
+            failures.append(f"{text!r} with fast answer {fast_answer!r}: called {actual}, expected {expected}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print(f"{len(CASES) + len(escalation_cases) - len(failures)}/{len(CASES) + len(escalation_cases)} routing cases passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Import-time budget test for ``import backend.main``.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.startup_budget [--max-seconds 1.5] [--max-modules 600]
+
+Each sample imports the app in a fresh interpreter. Exits with status 1 if
+the median import time or the number of newly loaded modules exceeds the
+budget, or if a module from LAZY_MODULES is imported eagerly, so it can gate
+a pre-commit hook or CI job as is.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import List
+
+# SDKs that must only be loaded on first use
+LAZY_MODULES = [
+    "google.generativeai",
+    "google.protobuf",
+    "langchain_core",
+    "langgraph",
+    "requests",
+]
+
+PROBE = """
+import json, sys, time
+before = set(sys.modules)
+started = time.perf_counter()
+import backend.main
+elapsed = time.perf_counter() - started
+loaded = set(sys.modules) - before
+print(json.dumps({
+    "seconds": elapsed,
+    "modules": len(loaded),
+    "eager": sorted(name for name in %r if name in sys.modules),
+}))
+""" % (LAZY_MODULES,)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def measure() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", PROBE],
+        cwd=REPO_ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check_budget(max_seconds: float, max_modules: int, samples: int) -> List[str]:
+    """Measures ``samples`` cold imports and returns the budget violations"""
+    results = [measure() for _ in range(samples)]
+    seconds = statistics.median(result["seconds"] for result in results)
+    modules = max(result["modules"] for result in results)
+    eager = sorted({name for result in results for name in result["eager"]})
+
+    print(f"import backend.main: {seconds:.3f}s median, {modules} modules loaded")
+
+    failures = []
+    if seconds > max_seconds:
+        failures.append(f"import time {seconds:.3f}s exceeds budget of {max_seconds:.3f}s")
+    if modules > max_modules:
+        failures.append(f"{modules} modules loaded, budget is {max_modules}")
+    if eager:
+        failures.append("eagerly imported: " + ", ".join(eager))
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-seconds", type=float, default=1.5)
+    parser.add_argument("--max-modules", type=int, default=600)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    failures = check_budget(args.max_seconds, args.max_modules, args.samples)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("FAILED" if failures else "OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .config import Config
+
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+SPEED_RECORDED = "recorded"
+SPEED_FAST = "fast"
+
+# Session of the turn being recorded or replayed; entries are tagged with it
+_session_id: ContextVar[Optional[str]] = ContextVar("cassette_session_id", default=None)
+
+
+class CassetteMiss(LookupError):
+    """Raised when replay runs out of recorded responses for a request kind"""
+
+
+@contextmanager
+def cassette_session(session_id: Optional[str]) -> Iterator[None]:
+    """Tags cassette entries recorded or replayed in this context with ``session_id``"""
+    token = _session_id.set(session_id)
+    try:
+        yield
+    finally:
+        _session_id.reset(token)
+
+
+def request_key(kind: str, request: Any) -> str:
+    encoded = json.dumps(request, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(f"{kind}:{encoded}".encode("utf-8")).hexdigest()
+
+
+def attribute_view(value: Any, key: str = "") -> Any:
+    """Wraps a recorded response dict so attribute access works like on SDK objects.
+
+    Function-call ``args`` stay plain dicts, matching what the live parser expects.
+    """
+    if isinstance(value, dict) and key != "args":
+        return SimpleNamespace(**{name: attribute_view(item, name) for name, item in value.items()})
+    if isinstance(value, list):
+        return [attribute_view(item) for item in value]
+    return value
+
+
+class ReplayedHTTPResponse:
+    """Minimal stand-in for ``requests.Response`` built from a cassette entry"""
+
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+class Cassette:
+    """Records upstream requests and responses with timings, or replays them.
+
+    Entries are JSON lines in a gzip file, each tagged with the session of the
+    turn that made it. On replay a request is matched to the first unused entry
+    of the same kind and session with an identical request; if there is none,
+    the next unused entry of that kind and session is used, so slightly
+    different prompts still replay deterministically in recorded order. Such
+    order-fallback matches are counted in ``fallbacks``, since the replay is
+    no longer an exact reproduction once they occur.
+    """
+
+    def __init__(self, path: str, mode: str = MODE_REPLAY, speed: str = SPEED_FAST):
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._entries: List[Dict[str, Any]] = []
+        self._used: set = set()
+        self._file = None
+        self.fallbacks: Counter = Counter()
+
+        if mode == MODE_REPLAY:
+            with gzip.open(path, "rt", encoding="utf-8") as handle:
+                self._entries = [json.loads(line) for line in handle if line.strip()]
+        elif mode == MODE_RECORD:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = gzip.open(path, "wt", encoding="utf-8")
+            atexit.register(self.close)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == MODE_RECORD
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == MODE_REPLAY
+
+    def record(self, kind: str, request: Any, response: Any = None, elapsed: float = 0.0) -> None:
+        entry = {
+            "kind": kind,
+            "session": _session_id.get(),
+            "key": request_key(kind, request),
+            "offset": round(time.perf_counter() - self._started, 4),
+            "elapsed": round(elapsed, 4),
+            "request": request,
+            "response": response,
+        }
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def replay(self, kind: str, request: Any) -> Any:
+        key = request_key(kind, request)
+        session = _session_id.get()
+        with self._lock:
+            candidates = [
+                i for i, entry in enumerate(self._entries)
+                if i not in self._used and entry["kind"] == kind and entry.get("session") == session
+            ]
+            index = next((i for i in candidates if self._entries[i]["key"] == key), None)
+            if index is None:
+                if not candidates:
+                    raise CassetteMiss(f"No recorded {kind} response left for session {session} in {self.path}")
+                index = candidates[0]
+                self.fallbacks[kind] += 1
+                print(f"[Cassette] {kind} request differs from recording, replaying entry {index} in order")
+            self._used.add(index)
+            entry = self._entries[index]
+
+        if self.speed == SPEED_RECORDED and entry["elapsed"]:
+            time.sleep(entry["elapsed"])
+        return entry["response"]
+
+    def call(
+        self,
+        kind: str,
+        request: Any,
+        perform: Callable[[], Any],
+        encode: Callable[[Any], Any],
+        decode: Callable[[Any], Any],
+    ) -> Any:
+        """Performs an upstream call, recording or replaying it depending on mode"""
+        if self.replaying:
+            return decode(self.replay(kind, request))
+
+        started = time.perf_counter()
+        response = perform()
+        if self.recording:
+            self.record(kind, request, encode(response), time.perf_counter() - started)
+        return response
+
+    def events(self, kind: str) -> Iterator[Dict[str, Any]]:
+        """Yields recorded entries of one kind, e.g. the user turns, with their session"""
+        for entry in self._entries:
+            if entry["kind"] == kind:
+                yield entry
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_cassette: Optional[Cassette] = None
+_configured = False
+_setup_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """Returns the process-wide cassette configured by CASSETTE_MODE, if any"""
+    global _cassette, _configured
+    if _configured:
+        return _cassette
+    # Turns and speculative requests call this from several threads; only one may
+    # open the file, and none may see the cassette before it is assigned
+    with _setup_lock:
+        if not _configured:
+            if Config.CASSETTE_MODE in (MODE_RECORD, MODE_REPLAY):
+                _cassette = Cassette(Config.CASSETTE_PATH, Config.CASSETTE_MODE, Config.CASSETTE_SPEED)
+                print(f"[Cassette] {Config.CASSETTE_MODE} mode, file {Config.CASSETTE_PATH}")
+            _configured = True
+    return _cassette
+
+
+def use_cassette(cassette: Optional[Cassette]) -> None:
+    """Installs a cassette explicitly, overriding the environment configuration"""
+    global _cassette, _configured
+    with _setup_lock:
+        _cassette = cassette
+        _configured = True
@@ -0,0 +1,150 @@
+import json
+import zlib
+from typing import Any, Callable, Dict, Optional
+
+from .config import Config
+
+try:
+    import zstandard
+except ImportError:  # zstd request bodies are accepted only when zstandard is installed
+    zstandard = None
+
+
+# zstd can expand a few input bytes into a 128 KB block, so input is fed in
+# small slices to keep each step's output bounded before the size check
+ZSTD_FEED_BYTES = 64
+
+
+class BodyTooLarge(Exception):
+    """Decompressed request body exceeds Config.MAX_DECOMPRESSED_BODY"""
+
+
+class CorruptBody(Exception):
+    """Request body could not be decompressed"""
+
+
+def supported_encodings() -> list:
+    encodings = ["gzip"]
+    if zstandard is not None:
+        encodings.append("zstd")
+    return encodings
+
+
+class StreamingDecompressor:
+    """Incrementally decompresses a request body while enforcing a size limit"""
+
+    def __init__(self, encoding: str, limit: int):
+        self.encoding = encoding
+        self.limit = limit
+        self.total = 0
+        if encoding == "gzip":
+            self._zlib = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        else:
+            self._zstd = zstandard.ZstdDecompressor().decompressobj()
+
+    def _count(self, chunk: bytes) -> bytes:
+        self.total += len(chunk)
+        if self.total > self.limit:
+            raise BodyTooLarge(f"decompressed body exceeds {self.limit} bytes")
+        return chunk
+
+    def feed(self, data: bytes) -> bytes:
+        try:
+            if self.encoding == "gzip":
+                output = []
+                while data:
+                    # Never inflate more than one byte past the limit in a single step
+                    output.append(self._count(self._zlib.decompress(data, self.limit - self.total + 1)))
+                    data = self._zlib.unconsumed_tail
+                return b"".join(output)
+
+            return b"".join(
+                self._count(self._zstd.decompress(data[offset:offset + ZSTD_FEED_BYTES]))
+                for offset in range(0, len(data), ZSTD_FEED_BYTES)
+            )
+        except (zlib.error, ValueError) as exc:
+            raise CorruptBody(str(exc))
+        except Exception as exc:
+            if zstandard is not None and isinstance(exc, zstandard.ZstdError):
+                raise CorruptBody(str(exc))
+            raise
+
+    def flush(self) -> bytes:
+        if self.encoding == "gzip":
+            if not self._zlib.eof:
+                raise CorruptBody("truncated gzip stream")
+            return self._count(self._zlib.flush())
+        if not self._zstd.eof:
+            raise CorruptBody("truncated zstd stream")
+        return b""
+
+
+class RequestDecompressionMiddleware:
+    """ASGI middleware that transparently decompresses gzip/zstd request bodies.
+
+    The body is inflated chunk by chunk as the endpoint reads it; bodies that
+    would exceed ``Config.MAX_DECOMPRESSED_BODY`` are rejected with 413,
+    unknown encodings with 415 and corrupt streams with 400.
+    """
+
+    def __init__(self, app: Callable, max_size: Optional[int] = None):
+        self.app = app
+        self.max_size = max_size or Config.MAX_DECOMPRESSED_BODY
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        encoding = headers.get(b"content-encoding", b"").decode("latin-1").strip().lower()
+        if not encoding or encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        if encoding not in supported_encodings():
+            await self._reject(send, 415, f"Unsupported Content-Encoding: {encoding}")
+            return
+
+        decompressor = StreamingDecompressor(encoding, self.max_size)
+        scope = dict(scope)
+        scope["headers"] = [
+            (name, value) for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+
+        async def decompressing_receive() -> Dict[str, Any]:
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+            body = decompressor.feed(message.get("body", b""))
+            if not message.get("more_body", False):
+                body += decompressor.flush()
+            return {"type": "http.request", "body": body, "more_body": message.get("more_body", False)}
+
+        response_started = False
+
+        async def tracking_send(message: Dict[str, Any]) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, decompressing_receive, tracking_send)
+        except (BodyTooLarge, CorruptBody) as exc:
+            if response_started:
+                raise
+            status = 413 if isinstance(exc, BodyTooLarge) else 400
+            print(f"[RequestDecompression] Rejecting {encoding} body: {exc}")
+            await self._reject(send, status, str(exc))
+
+    @staticmethod
+    async def _reject(send: Callable, status: int, detail: str) -> None:
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
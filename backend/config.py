@@ -9,9 +9,34 @@ class Config:
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 
+    # Tiered model routing: cheap turns go to the fast model, research and
+    # escalations go to the strong one. Opt-in, since it moves most turns off GEMINI_MODEL
+    MODEL_ROUTING = os.getenv("MODEL_ROUTING", "false").lower() in ("1", "true", "yes")
+    GEMINI_FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", "gemini-2.5-flash-lite")
+    GEMINI_STRONG_MODEL = os.getenv("GEMINI_STRONG_MODEL", GEMINI_MODEL)
+
+    # Sampling temperature per route
+    ROUTE_TEMPERATURES = {
+        "chit_chat": 0.7,
+        "page": 0.3,
+        "research": 0.4,
+    }
+
+    # USD per 1M tokens (input, output), used for per-route cost accounting
+    MODEL_PRICING = {
+        "gemini-2.5-flash-lite": (0.10, 0.40),
+        "gemini-2.5-flash": (0.30, 2.50),
+        "gemini-2.5-pro": (1.25, 10.00),
+    }
+
     # EXA MCP configuration
     EXA_API_KEY = os.getenv("EXA_API_KEY")
 
+    # Speculative Exa research started alongside the first LLM call of a turn
+    EXA_SPECULATIVE = os.getenv("EXA_SPECULATIVE", "false").lower() in ("1", "true", "yes")
+    SPECULATIVE_MATCH_THRESHOLD = float(os.getenv("SPECULATIVE_MATCH_THRESHOLD", 0.6))
+    SPECULATIVE_WORKERS = int(os.getenv("SPECULATIVE_WORKERS", 4))
+
     # ElevenLabs API configuration
     ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 
@@ -19,6 +44,47 @@ class Config:
     HOST = os.getenv("HOST", "localhost")
     PORT = int(os.getenv("PORT", 8000))
 
+    # Compress tool results and page context kept in session history
+    HISTORY_COMPRESSION = os.getenv("HISTORY_COMPRESSION", "true").lower() in ("1", "true", "yes")
+    HISTORY_COMPRESS_MIN_CHARS = int(os.getenv("HISTORY_COMPRESS_MIN_CHARS", 1024))
+
+    # Record/replay of upstream Gemini and Exa traffic: off, record or replay
+    CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off").lower()
+    CASSETTE_PATH = os.getenv("CASSETTE_PATH", "cassettes/session.jsonl.gz")
+    # Replay speed: "recorded" sleeps for the recorded latency, "fast" does not
+    CASSETTE_SPEED = os.getenv("CASSETTE_SPEED", "fast").lower()
+
+    # WebSocket connection management
+    WS_MAX_CONNECTIONS = int(os.getenv("WS_MAX_CONNECTIONS", 1000))
+    WS_MAX_CONNECTIONS_PER_SESSION = int(os.getenv("WS_MAX_CONNECTIONS_PER_SESSION", 4))
+    # Protocol-level pings; a peer that does not answer within the timeout is disconnected
+    WS_PING_INTERVAL = float(os.getenv("WS_PING_INTERVAL", 20))
+    WS_PING_TIMEOUT = float(os.getenv("WS_PING_TIMEOUT", 20))
+    WS_INBOUND_QUEUE_SIZE = int(os.getenv("WS_INBOUND_QUEUE_SIZE", 8))
+    WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", 10))
+
+    # Compressed transport: request bodies may be gzip or zstd (if zstandard is installed)
+    MAX_DECOMPRESSED_BODY = int(os.getenv("MAX_DECOMPRESSED_BODY", 10 * 1024 * 1024))
+    GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", 1024))
+    GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+    WS_PER_MESSAGE_DEFLATE = os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() in ("1", "true", "yes")
+
+    # Per-turn budgets: total wall time, tool iterations and per-call timeout caps
+    TURN_TIME_BUDGET = float(os.getenv("TURN_TIME_BUDGET", 60))
+    MAX_TOOL_ITERATIONS = int(os.getenv("MAX_TOOL_ITERATIONS", 3))
+    GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", 30))
+    EXA_TIMEOUT = float(os.getenv("EXA_TIMEOUT", 40))
+    # Sub-calls are not started with less time than this left
+    MIN_CALL_TIMEOUT = float(os.getenv("MIN_CALL_TIMEOUT", 2))
+
+    # Admin-only profiling endpoints under /debug, disabled by default
+    DEBUG_ENDPOINTS = os.getenv("DEBUG_ENDPOINTS", "false").lower() in ("1", "true", "yes")
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005))
+
+    # Import SDKs and build clients during startup instead of on the first request
+    WARM_UP = os.getenv("WARM_UP", "false").lower() in ("1", "true", "yes")
+
     # CORS settings for Chrome extension
     ALLOWED_ORIGINS = [
         "chrome-extension://*",  # Allow all Chrome extensions
@@ -0,0 +1,206 @@
+import asyncio
+import json
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from fastapi import WebSocket
+from starlette.websockets import WebSocketDisconnect, WebSocketState
+
+from .config import Config
+
+
+# Close codes (RFC 6455)
+CLOSE_TRY_AGAIN_LATER = 1013
+
+PAGE_FIELDS = ("page_content", "page_details")
+
+
+class SlowConsumer(Exception):
+    """Raised when a client does not read outbound frames within the send timeout"""
+
+
+@dataclass
+class ConnectionStats:
+    """Live counters for WebSocket connections of this worker"""
+    active: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    frames_in: int = 0
+    frames_out: int = 0
+    coalesced: int = 0
+    dropped: int = 0
+    slow_closed: int = 0
+
+
+def is_page_update(frame: Dict[str, Any]) -> bool:
+    return "message" not in frame and any(key in frame for key in PAGE_FIELDS)
+
+
+class InboundQueue:
+    """Bounded queue of client frames that coalesces consecutive page updates.
+
+    A page-only frame arriving right behind another queued page-only frame is
+    merged into it, so a client streaming page changes while a turn runs
+    occupies one slot instead of many.
+    """
+
+    def __init__(self, maxsize: int, stats: ConnectionStats):
+        self.maxsize = maxsize
+        self.stats = stats
+        self._frames: Deque[Dict[str, Any]] = deque()
+        self._ready = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def put(self, frame: Dict[str, Any]) -> bool:
+        """Queues a frame; returns False if the queue is full"""
+        if is_page_update(frame) and self._frames and is_page_update(self._frames[-1]):
+            self._frames[-1].update(frame)
+            self.stats.coalesced += 1
+            return True
+        if len(self._frames) >= self.maxsize:
+            self.stats.dropped += 1
+            return False
+        self._frames.append(frame)
+        self._ready.set()
+        return True
+
+    async def get(self) -> Dict[str, Any]:
+        while not self._frames:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._frames.popleft()
+
+
+class Connection:
+    """One accepted WebSocket with a bounded inbound queue and send backpressure.
+
+    Liveness is left to protocol-level ping/pong (uvicorn ``ws_ping_interval`` and
+    ``ws_ping_timeout``), which browsers answer without any client code, so a
+    client quietly waiting for a long turn is never closed.
+    """
+
+    def __init__(self, websocket: WebSocket, session_id: str, manager: "ConnectionManager"):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.manager = manager
+        self.queue = InboundQueue(Config.WS_INBOUND_QUEUE_SIZE, manager.stats)
+        # The latest turn started for this connection; it keeps running after a disconnect
+        self.turn: Optional[asyncio.Future] = None
+        self._send_lock = asyncio.Lock()
+
+    async def send_json(self, data: Dict[str, Any]) -> None:
+        """Sends a frame, failing fast if the client is not draining its socket"""
+        async with self._send_lock:
+            try:
+                await asyncio.wait_for(self.websocket.send_json(data), Config.WS_SEND_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise SlowConsumer(f"send blocked for more than {Config.WS_SEND_TIMEOUT}s")
+        self.manager.stats.frames_out += 1
+
+    async def _read(self) -> None:
+        while True:
+            data = await self.websocket.receive_text()
+            self.manager.stats.frames_in += 1
+
+            try:
+                frame = json.loads(data)
+            except json.JSONDecodeError:
+                await self.send_json({"status": "error", "message": "Invalid JSON frame"})
+                continue
+            if not isinstance(frame, dict):
+                await self.send_json({"status": "error", "message": "Frame must be a JSON object"})
+                continue
+
+            if not self.queue.put(frame):
+                await self.send_json({
+                    "status": "error",
+                    "message": "Too many pending messages, please wait for the current response",
+                })
+
+    async def _work(self, handler: Callable[["Connection", Dict[str, Any]], Awaitable[None]]) -> None:
+        while True:
+            frame = await self.queue.get()
+            await handler(self, frame)
+
+    async def run(self, handler: Callable[["Connection", Dict[str, Any]], Awaitable[None]]) -> None:
+        """Serves the connection until the client disconnects or stops reading"""
+        tasks = [
+            asyncio.create_task(self._read()),
+            asyncio.create_task(self._work(handler)),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        error = next((task.exception() for task in done if not task.cancelled() and task.exception()), None)
+        if isinstance(error, WebSocketDisconnect):
+            return
+        if isinstance(error, SlowConsumer):
+            self.manager.stats.slow_closed += 1
+            await self.close(CLOSE_TRY_AGAIN_LATER, "slow consumer")
+        elif error is not None:
+            raise error
+
+    async def close(self, code: int, reason: str) -> None:
+        print(f"[ConnectionManager] Closing {self.session_id}: {reason}")
+        if self.websocket.client_state == WebSocketState.CONNECTED:
+            try:
+                await self.websocket.close(code=code, reason=reason)
+            except RuntimeError:
+                pass
+
+
+class ConnectionManager:
+    """Tracks WebSocket connections of this worker and enforces connection limits"""
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_per_session: Optional[int] = None,
+    ):
+        self.max_connections = max_connections or Config.WS_MAX_CONNECTIONS
+        self.max_per_session = max_per_session or Config.WS_MAX_CONNECTIONS_PER_SESSION
+        self.stats = ConnectionStats()
+        self._sessions: Dict[str, int] = {}
+
+    async def connect(self, websocket: WebSocket, session_id: str) -> Optional[Connection]:
+        """Accepts the socket, or rejects it and returns None when a limit is reached"""
+        if self.stats.active >= self.max_connections or self._sessions.get(session_id, 0) >= self.max_per_session:
+            self.stats.rejected += 1
+            print(f"[ConnectionManager] Rejecting connection for session {session_id}: limit reached")
+            await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+            return None
+
+        await websocket.accept()
+        self.stats.active += 1
+        self.stats.accepted += 1
+        self._sessions[session_id] = self._sessions.get(session_id, 0) + 1
+        return Connection(websocket, session_id, self)
+
+    def disconnect(self, connection: Connection) -> None:
+        self.stats.active -= 1
+        remaining = self._sessions.get(connection.session_id, 1) - 1
+        if remaining > 0:
+            self._sessions[connection.session_id] = remaining
+        else:
+            self._sessions.pop(connection.session_id, None)
+
+    def connected(self, session_id: str) -> bool:
+        """Whether the session still has an open connection on this worker"""
+        return session_id in self._sessions
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = asdict(self.stats)
+        data["sessions"] = len(self._sessions)
+        data["max_connections"] = self.max_connections
+        data["max_per_session"] = self.max_per_session
+        return data
+
+
+connection_manager = ConnectionManager()
@@ -0,0 +1,38 @@
+import time
+from typing import Callable, Optional
+
+from .config import Config
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when too little of the turn budget is left to start a sub-call"""
+
+
+def is_timeout_error(exc: BaseException) -> bool:
+    """Recognizes timeouts from the standard library, requests and google-api-core"""
+    if isinstance(exc, TimeoutError):
+        return True
+    name = type(exc).__name__.lower()
+    return "timeout" in name or "deadline" in name
+
+
+class Deadline:
+    """Wall-clock budget of one turn, shared by the LLM and tool calls it makes"""
+
+    def __init__(self, budget: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.budget = Config.TURN_TIME_BUDGET if budget is None else budget
+        self.clock = clock
+        self.started = clock()
+
+    def remaining(self) -> float:
+        return max(0.0, self.budget - (self.clock() - self.started))
+
+    def expired(self) -> bool:
+        return self.remaining() < Config.MIN_CALL_TIMEOUT
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Timeout for the next sub-call: the remaining budget, capped at ``cap``"""
+        remaining = self.remaining()
+        if remaining < Config.MIN_CALL_TIMEOUT:
+            raise DeadlineExceeded(f"{remaining:.1f}s left of the {self.budget:.0f}s turn budget")
+        return min(remaining, cap) if cap else remaining
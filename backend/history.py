@@ -0,0 +1,127 @@
+import json
+import zlib
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .config import Config
+
+
+ROLE_HUMAN = "human"
+ROLE_AI = "ai"
+ROLE_SYSTEM = "system"
+ROLE_TOOL = "tool"
+
+PackedText = Union[str, bytes]
+
+
+def pack_text(text: str) -> PackedText:
+    """Compresses large text with zlib when it actually saves space"""
+    if not Config.HISTORY_COMPRESSION or len(text) < Config.HISTORY_COMPRESS_MIN_CHARS:
+        return text
+    packed = zlib.compress(text.encode("utf-8"))
+    return packed if len(packed) < len(text) else text
+
+
+def unpack_text(value: PackedText) -> str:
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode("utf-8")
+    return value
+
+
+class HistoryRecord:
+    """One stored turn; tool calls are kept as (id, name, json-encoded args) tuples"""
+
+    __slots__ = ("role", "text", "tool_calls", "tool_call_id")
+
+    def __init__(
+        self,
+        role: str,
+        text: PackedText,
+        tool_calls: Optional[Tuple[Tuple[str, str, str], ...]] = None,
+        tool_call_id: Optional[str] = None,
+    ):
+        self.role = role
+        self.text = text
+        self.tool_calls = tool_calls
+        self.tool_call_id = tool_call_id
+
+
+class CompactHistory:
+    """At-rest conversation history that avoids retaining LangChain message objects.
+
+    Messages are converted to slotted records (role, text, tool calls) and
+    materialized back into LangChain messages only when the graph runs. Tool
+    results and page context above ``Config.HISTORY_COMPRESS_MIN_CHARS`` are
+    zlib-compressed.
+    """
+
+    __slots__ = ("_records", "_page", "page_length", "has_page_details")
+
+    def __init__(self):
+        self._records: List[HistoryRecord] = []
+        self._page: Optional[PackedText] = None
+        self.page_length = 0
+        self.has_page_details = False
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def append_messages(self, messages: List[Any]) -> None:
+        for message in messages:
+            role = getattr(message, "type", ROLE_SYSTEM)
+            text = message.content if isinstance(message.content, str) else json.dumps(message.content, ensure_ascii=False)
+            if role == ROLE_TOOL:
+                self._records.append(HistoryRecord(role, pack_text(text), tool_call_id=message.tool_call_id))
+            elif role == ROLE_AI and message.tool_calls:
+                tool_calls = tuple(
+                    (
+                        call.get("id") or "",
+                        call.get("name", ""),
+                        json.dumps(call.get("args") or {}, ensure_ascii=False, separators=(",", ":")),
+                    )
+                    for call in message.tool_calls
+                )
+                self._records.append(HistoryRecord(role, text, tool_calls=tool_calls))
+            else:
+                self._records.append(HistoryRecord(role, text))
+
+    def to_messages(self) -> List[Any]:
+        """Materializes the stored turns into LangChain messages"""
+        from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
+
+        messages: List[Any] = []
+        for record in self._records:
+            text = unpack_text(record.text)
+            if record.role == ROLE_HUMAN:
+                messages.append(HumanMessage(content=text))
+            elif record.role == ROLE_AI:
+                tool_calls = [
+                    {"id": call_id, "name": name, "args": json.loads(args)}
+                    for call_id, name, args in record.tool_calls or ()
+                ]
+                messages.append(AIMessage(content=text, tool_calls=tool_calls))
+            elif record.role == ROLE_TOOL:
+                messages.append(ToolMessage(content=text, tool_call_id=record.tool_call_id))
+            else:
+                messages.append(SystemMessage(content=text))
+        return messages
+
+    def last_text(self) -> str:
+        return unpack_text(self._records[-1].text) if self._records else ""
+
+    def pack_page(self, page_content: str, page_details: Dict[str, Any]) -> None:
+        """Stores page text and details, compressed when large"""
+        self._page = pack_text(json.dumps([page_content, page_details], ensure_ascii=False))
+        self.page_length = len(page_content)
+        self.has_page_details = bool(page_details)
+
+    def unpack_page(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Returns the stored page text and details, releasing them from the history"""
+        if self._page is None:
+            return None
+        page_content, page_details = json.loads(unpack_text(self._page))
+        self._page = None
+        return page_content, page_details
+
+    @property
+    def has_packed_page(self) -> bool:
+        return self._page is not None
@@ -1,20 +1,45 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.websockets import WebSocketDisconnect
+import asyncio
 import json
 import uuid
+import weakref
 from typing import Dict, Any
 from .config import Config
-from .agent import AgentState, process_message
-from langchain_core.messages import BaseMessage
+from .agent import AgentState, process_message, warm_up
+from .deadline import Deadline
+from .routing import routing_metrics
+from .speculation import speculation_metrics
+from .connections import Connection, SlowConsumer, connection_manager
+from .compression import RequestDecompressionMiddleware
+from .profiling import debug_state, install as install_debug_endpoints
 
-# Validate configuration on startup
-try:
-    Config.validate()
-except ValueError as e:
-    print(f"Configuration warning: {e}")
 
-app = FastAPI(title="LangGraph AI Agent", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Validate configuration and optionally warm up SDK clients on startup"""
+    try:
+        Config.validate()
+    except ValueError as e:
+        print(f"Configuration warning: {e}")
+
+    if Config.WARM_UP:
+        await run_in_threadpool(warm_up)
+        print("Clients warmed up")
+
+    yield
+
+
+app = FastAPI(title="LangGraph AI Agent", version="1.0.0", lifespan=lifespan)
+
+# Compressed page uploads and responses (inner to CORS so error responses keep CORS headers)
+app.add_middleware(RequestDecompressionMiddleware)
+app.add_middleware(GZipMiddleware, minimum_size=Config.GZIP_MIN_SIZE, compresslevel=Config.GZIP_LEVEL)
 
 # Add CORS middleware for Chrome extension
 app.add_middleware(
@@ -28,6 +53,29 @@ app.add_middleware(
 # In-memory session storage (no database for local operation)
 sessions: Dict[str, AgentState] = {}
 
+# AgentState is not thread-safe: turns, page updates and cleanup of a session
+# take its lock. An entry disappears once no task holds or awaits the lock.
+session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+def session_lock(session_id: str) -> asyncio.Lock:
+    lock = session_locks.get(session_id)
+    if lock is None:
+        lock = session_locks[session_id] = asyncio.Lock()
+    return lock
+
+def describe_sessions() -> Dict[str, Any]:
+    """Session counts for memory debugging"""
+    return {
+        "count": len(sessions),
+        "messages": sum(state.message_count() for state in list(sessions.values())),
+    }
+
+# Admin-only profiling endpoints; when disabled, turns run unwrapped and nothing is mounted
+if install_debug_endpoints(app, describe_sessions):
+    process_turn = debug_state.turn_allocations.wrap(process_message)
+else:
+    process_turn = process_message
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -36,6 +84,8 @@ async def root():
 @app.post("/chat/{session_id}")
 async def chat(session_id: str, request: Request):
     """Process a chat message and return response"""
+    # The turn budget covers reading the body and waiting for the session lock
+    deadline = Deadline()
     try:
         body = await request.json()
         print(f"Received request for session {session_id}: {body}")
@@ -46,27 +96,15 @@ async def chat(session_id: str, request: Request):
         print(f"JSON decode error for session {session_id}: {e}")
         raise HTTPException(status_code=400, detail="Invalid JSON body")
 
-    # Get or create session
-    if session_id not in sessions:
-        sessions[session_id] = AgentState()
-
-    state = sessions[session_id]
-    state.page_content = page_content
-    state.page_details = page_details
-
     # Process message
     try:
-        result_state = process_message(state, message)
-        sessions[session_id] = result_state
+        # Runs in the threadpool like WebSocket turns; shielded so the session lock
+        # stays held until the thread finishes even if the request is cancelled
+        page_fields = {"page_content": page_content, "page_details": page_details}
+        result_state = await asyncio.shield(asyncio.ensure_future(run_turn(session_id, message, page_fields, deadline)))
 
         # Get the last AI response
-        last_message = result_state.messages[-1] if result_state.messages else None
-        if isinstance(last_message, BaseMessage):
-            response_content = getattr(last_message, "content", "") or ""
-        elif isinstance(last_message, dict):
-            response_content = last_message.get('content', '')
-        else:
-            response_content = str(last_message) if last_message else "No response generated"
+        response_content = result_state.last_response()
 
         print(f"Generated response for session {session_id}: {response_content[:100]}...")
         return {
@@ -81,60 +119,111 @@ async def chat(session_id: str, request: Request):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
+async def run_turn(session_id: str, message: str, page_fields: Dict[str, Any], deadline: Deadline) -> AgentState:
+    """Applies the page update and runs a turn in the threadpool under the session lock"""
+    async with session_lock(session_id):
+        state = sessions.setdefault(session_id, AgentState())
+        if page_fields:
+            state.update_page(**page_fields)
+        result_state = await run_in_threadpool(
+            process_turn, state, message, deadline=deadline, session_id=session_id
+        )
+        sessions[session_id] = result_state
+        return result_state
+
+async def handle_ws_frame(connection: Connection, message_data: Dict[str, Any]) -> None:
+    """Applies one queued client frame to the session and runs a turn if it carries a message"""
+    # The turn budget covers waiting for the session lock behind other turns
+    deadline = Deadline()
+    session_id = connection.session_id
+    page_fields = {
+        key: message_data[key] for key in ("page_content", "page_details") if key in message_data
+    }
+
+    # Update session state
+    if "message" not in message_data:
+        if page_fields:
+            async with session_lock(session_id):
+                sessions.setdefault(session_id, AgentState()).update_page(**page_fields)
+        return
+
+    # Send status update
+    await connection.send_json({"status": "thinking", "message": "Processing your request..."})
+
+    try:
+        # Shielded: a disconnect cancels this handler, but the thread keeps using the
+        # state, so the turn must hold the session lock until it actually finishes
+        connection.turn = asyncio.ensure_future(run_turn(session_id, message_data["message"], page_fields, deadline))
+        result_state = await asyncio.shield(connection.turn)
+
+        # Send final response
+        response_content = result_state.last_response()
+
+        await connection.send_json({
+            "status": "completed",
+            "response": response_content,
+            "current_tool": result_state.current_tool
+        })
+
+    except (SlowConsumer, WebSocketDisconnect):
+        raise
+    except Exception as e:
+        await connection.send_json({
+            "status": "error",
+            "message": f"Error: {str(e)}"
+        })
+
+async def release_session(session_id: str) -> None:
+    """Frees per-session resources once the session's last connection is gone"""
+    async with session_lock(session_id):
+        state = sessions.get(session_id)
+        if state is None or connection_manager.connected(session_id):
+            return
+        if state.message_count() == 0:
+            del sessions[session_id]
+        else:
+            state.compact()
+
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     """WebSocket endpoint for real-time status updates"""
-    await websocket.accept()
+    connection = await connection_manager.connect(websocket, session_id)
+    if connection is None:
+        return
 
     # Get or create session
     if session_id not in sessions:
         sessions[session_id] = AgentState()
 
     try:
-        while True:
-            # Wait for messages from client
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
-
-            # Update session state
-            state = sessions[session_id]
-            if "page_content" in message_data:
-                state.page_content = message_data["page_content"]
-            if "page_details" in message_data:
-                state.page_details = message_data["page_details"]
-
-            # Process message if provided
-            if "message" in message_data:
-                # Send status update
-                await websocket.send_json({"status": "thinking", "message": "Processing your request..."})
-
-                try:
-                    result_state = process_message(state, message_data["message"])
-                    sessions[session_id] = result_state
-
-                    # Send final response
-                    last_message = result_state.messages[-1] if result_state.messages else None
-                    if isinstance(last_message, BaseMessage):
-                        response_content = getattr(last_message, "content", "") or ""
-                    elif isinstance(last_message, dict):
-                        response_content = last_message.get('content', '')
-                    else:
-                        response_content = str(last_message) if last_message else "No response generated"
-
-                    await websocket.send_json({
-                        "status": "completed",
-                        "response": response_content,
-                        "current_tool": result_state.current_tool
-                    })
-
-                except Exception as e:
-                    await websocket.send_json({
-                        "status": "error",
-                        "message": f"Error: {str(e)}"
-                    })
-
+        await connection.run(handle_ws_frame)
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        import traceback
+
+        print(f"WebSocket error for session {session_id}: {e}")
+        traceback.print_exc()
+        await connection.close(1011, "internal error")
+    finally:
+        connection_manager.disconnect(connection)
+        if connection.turn is not None:
+            # The client is gone but its turn may still be running in the threadpool
+            await asyncio.gather(connection.turn, return_exceptions=True)
+        await release_session(session_id)
+
+@app.get("/metrics/routing")
+async def get_routing_metrics():
+    """Per-route call counts, latency and estimated cost"""
+    return routing_metrics.snapshot()
+
+@app.get("/metrics/speculation")
+async def get_speculation_metrics():
+    """Speculative Exa research hit rate and wall-clock saved"""
+    return speculation_metrics.snapshot()
+
+@app.get("/metrics/connections")
+async def get_connection_metrics():
+    """Live WebSocket connection counters for this worker"""
+    return connection_manager.snapshot()
 
 @app.get("/sessions/{session_id}")
 async def get_session(session_id: str):
@@ -145,20 +234,28 @@ async def get_session(session_id: str):
     state = sessions[session_id]
     return {
         "session_id": session_id,
-        "message_count": len(state.messages),
-        "page_content_length": len(state.page_content),
-        "has_page_details": bool(state.page_details)
+        "message_count": state.message_count(),
+        "page_content_length": state.page_length(),
+        "has_page_details": state.has_page_details()
     }
 
 @app.delete("/sessions/{session_id}")
 async def delete_session(session_id: str):
     """Delete a session"""
-    if session_id in sessions:
-        del sessions[session_id]
-        return {"message": "Session deleted"}
-    else:
-        raise HTTPException(status_code=404, detail="Session not found")
+    async with session_lock(session_id):
+        if session_id in sessions:
+            del sessions[session_id]
+            return {"message": "Session deleted"}
+        else:
+            raise HTTPException(status_code=404, detail="Session not found")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host=Config.HOST, port=Config.PORT)
+    uvicorn.run(
+        app,
+        host=Config.HOST,
+        port=Config.PORT,
+        ws_ping_interval=Config.WS_PING_INTERVAL,
+        ws_ping_timeout=Config.WS_PING_TIMEOUT,
+        ws_per_message_deflate=Config.WS_PER_MESSAGE_DEFLATE,
+    )
@@ -0,0 +1,248 @@
+import asyncio
+import os
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from .config import Config
+
+
+def require_admin(x_admin_token: str = Header("")) -> None:
+    """Rejects requests without the configured admin token"""
+    if not Config.ADMIN_TOKEN or not secrets.compare_digest(x_admin_token, Config.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads into flamegraph-compatible collapsed stacks"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                labels: List[str] = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def top(self, limit: int) -> str:
+        """pstats-style summary: functions by self and cumulative samples"""
+        own: Counter = Counter()
+        cumulative: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for label in set(frames):
+                cumulative[label] += count
+        lines = [f"{self.samples} samples every {self.interval * 1000:.1f} ms", f"{'self':>8} {'cumulative':>11}  function"]
+        for label, count in own.most_common(limit):
+            lines.append(f"{count:>8} {cumulative[label]:>11}  {label}")
+        return "\n".join(lines)
+
+
+class TurnAllocations:
+    """Records memory allocated by each agent turn"""
+
+    def __init__(self, maxlen: int = 100):
+        self._lock = threading.Lock()
+        self.turns: Deque[Dict[str, Any]] = deque(maxlen=maxlen)
+
+    def wrap(self, process_message: Callable) -> Callable:
+        @wraps(process_message)
+        def counted(state: Any, message: str, *args: Any, **kwargs: Any) -> Any:
+            tracing = tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.reset_peak()
+                traced_before, _ = tracemalloc.get_traced_memory()
+            blocks_before = sys.getallocatedblocks()
+            started = time.perf_counter()
+            try:
+                return process_message(state, message, *args, **kwargs)
+            finally:
+                record = {
+                    "message_chars": len(message),
+                    "seconds": round(time.perf_counter() - started, 4),
+                    # Counts are process-wide, so concurrent turns overlap
+                    "allocated_blocks_delta": sys.getallocatedblocks() - blocks_before,
+                }
+                if tracing and tracemalloc.is_tracing():
+                    traced_after, peak = tracemalloc.get_traced_memory()
+                    record["traced_bytes_delta"] = traced_after - traced_before
+                    record["traced_bytes_peak"] = peak - traced_before
+                with self._lock:
+                    self.turns.append(record)
+
+        return counted
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.turns)
+
+
+class RequestCounter:
+    """ASGI middleware counting completed HTTP requests, for request-bounded profiles"""
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if scope["type"] == "http" and not scope["path"].startswith("/debug/"):
+                debug_state.requests_completed += 1
+
+
+class DebugState:
+    def __init__(self):
+        self.requests_completed = 0
+        self.profiling = False
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self.turn_allocations = TurnAllocations()
+
+
+debug_state = DebugState()
+
+
+def _format_stats(stats: List[Any], limit: int) -> List[str]:
+    return [str(stat) for stat in stats[:limit]]
+
+
+def create_debug_router(describe_sessions: Callable[[], Dict[str, Any]]) -> APIRouter:
+    router = APIRouter(prefix="/debug", dependencies=[Depends(require_admin)])
+
+    @router.post("/profile/cpu", response_class=PlainTextResponse)
+    async def profile_cpu(
+        seconds: float = Query(10.0, gt=0, le=300),
+        requests: int = Query(0, ge=0),
+        format: str = Query("collapsed", pattern="^(collapsed|top)$"),
+        limit: int = Query(40, ge=1),
+    ):
+        """Samples all threads for ``seconds``, or until ``requests`` more requests complete"""
+        if debug_state.profiling:
+            raise HTTPException(status_code=409, detail="A CPU profile is already running")
+        debug_state.profiling = True
+        profiler = SamplingProfiler(Config.PROFILE_SAMPLE_INTERVAL)
+        target = debug_state.requests_completed + requests
+        deadline = time.monotonic() + seconds
+        profiler.start()
+        try:
+            while time.monotonic() < deadline:
+                if requests and debug_state.requests_completed >= target:
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            profiler.stop()
+            debug_state.profiling = False
+        return profiler.collapsed() if format == "collapsed" else profiler.top(limit)
+
+    @router.post("/memory/start")
+    async def memory_start(frames: int = Query(1, ge=1, le=100)):
+        """Starts tracemalloc; allocations before this call are not tracked.
+
+        More ``frames`` make group_by=traceback useful but slow down every allocation.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        debug_state.baseline = None
+        return {"tracing": True, "frames": tracemalloc.get_traceback_limit()}
+
+    @router.post("/memory/stop")
+    async def memory_stop():
+        tracemalloc.stop()
+        debug_state.baseline = None
+        return {"tracing": False}
+
+    @router.get("/memory/snapshot")
+    async def memory_snapshot(limit: int = Query(20, ge=1), group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$")):
+        """Top allocation sites; the snapshot also becomes the baseline for /memory/diff"""
+        if not tracemalloc.is_tracing():
+            raise HTTPException(status_code=409, detail="tracemalloc is not running, POST /debug/memory/start first")
+        # Snapshots of a large heap take seconds; keep them off the event loop
+        snapshot = await run_in_threadpool(tracemalloc.take_snapshot)
+        debug_state.baseline = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        stats = await run_in_threadpool(snapshot.statistics, group_by)
+        return {
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "sessions": describe_sessions(),
+            "top": _format_stats(stats, limit),
+        }
+
+    @router.get("/memory/diff")
+    async def memory_diff(limit: int = Query(20, ge=1)):
+        """Allocation growth since the previous snapshot or diff"""
+        if not tracemalloc.is_tracing():
+            raise HTTPException(status_code=409, detail="tracemalloc is not running, POST /debug/memory/start first")
+        snapshot = await run_in_threadpool(tracemalloc.take_snapshot)
+        baseline, debug_state.baseline = debug_state.baseline, snapshot
+        if baseline is None:
+            raise HTTPException(status_code=409, detail="No baseline yet; this snapshot is now the baseline")
+        growth = await run_in_threadpool(snapshot.compare_to, baseline, "lineno")
+        return {
+            "sessions": describe_sessions(),
+            "growth": _format_stats(growth, limit),
+        }
+
+    @router.get("/turns")
+    async def turn_allocations():
+        """Allocation counters for the most recent agent turns"""
+        return debug_state.turn_allocations.snapshot()
+
+    return router
+
+
+def install(app: FastAPI, describe_sessions: Callable[[], Dict[str, Any]]) -> bool:
+    """Mounts the admin debug endpoints; nothing is installed unless enabled and protected"""
+    if not Config.DEBUG_ENDPOINTS:
+        return False
+    if not Config.ADMIN_TOKEN:
+        print("Warning: DEBUG_ENDPOINTS is set but ADMIN_TOKEN is not, debug endpoints are disabled")
+        return False
+    app.add_middleware(RequestCounter)
+    app.include_router(create_debug_router(describe_sessions))
+    return True
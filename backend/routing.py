@@ -0,0 +1,211 @@
+import re
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import Config
+
+
+ROUTE_CHIT_CHAT = "chit_chat"
+ROUTE_PAGE = "page"
+ROUTE_RESEARCH = "research"
+
+TIER_FAST = "fast"
+TIER_STRONG = "strong"
+
+ROUTE_TIERS = {
+    ROUTE_CHIT_CHAT: TIER_FAST,
+    ROUTE_PAGE: TIER_FAST,
+    ROUTE_RESEARCH: TIER_STRONG,
+}
+
+_CHIT_CHAT_PHRASE = (
+    r"(привет\w*|здравствуй\w*|добр\w+ (утро|день|вечер)|спасибо( большое)?|благодарю|пока|ок|окей|"
+    r"хорошо|понятно|ясно|как дела\w*|hi|hello|hey|thanks|thank you|bye|ok|okay|got it)"
+)
+
+# The whole message must be greetings or acknowledgements; "ок, а какие поля
+# обязательны?" is a page question that merely starts like chit-chat
+CHIT_CHAT_PATTERN = re.compile(
+    rf"\s*{_CHIT_CHAT_PHRASE}([\s,.!?)]+{_CHIT_CHAT_PHRASE})*[\s,.!?)(:]*",
+    re.IGNORECASE,
+)
+
+# Whole-word phrases that mean the web has to be consulted
+RESEARCH_PATTERN = re.compile(
+    r"\b(найди\w*|найти|поищи\w*|поиск\w*|в интернете|в сети|сравни\w*|последн\w+ новост\w*|новост\w*|"
+    r"актуальн\w*|свеж\w*|исследуй\w*|источник\w*|аналогичн\w*|похож\w*|альтернатив\w*|"
+    r"search\w*|find|latest|news|compar(e|es|ing|ison)|research|sources|similar|alternatives?|comparable|competitors?)\b",
+    re.IGNORECASE,
+)
+
+# Hedging in a fast-model answer that warrants a second opinion
+LOW_CONFIDENCE_MARKERS = [
+    "не уверен", "не знаю", "затрудняюсь", "не могу ответить", "нет информации",
+    "i'm not sure", "i am not sure", "i don't know",
+]
+
+
+def _message_type(message: Any) -> str:
+    return getattr(message, "type", "") or ""
+
+
+def last_user_text(messages: List[Any]) -> str:
+    """Returns the text of the most recent human message"""
+    for message in reversed(messages):
+        if _message_type(message) == "human":
+            return str(getattr(message, "content", "") or "")
+    return ""
+
+
+def classify_turn(text: str) -> str:
+    """Cheap heuristic classification of a user turn into a route"""
+    stripped = (text or "").strip()
+    if not stripped:
+        return ROUTE_CHIT_CHAT
+
+    if RESEARCH_PATTERN.search(stripped):
+        return ROUTE_RESEARCH
+
+    if CHIT_CHAT_PATTERN.fullmatch(stripped):
+        return ROUTE_CHIT_CHAT
+
+    return ROUTE_PAGE
+
+
+def is_low_confidence(response: Any) -> bool:
+    """Empty output or an explicitly hedged answer without tool calls"""
+    if getattr(response, "tool_calls", None):
+        return False
+    content = str(getattr(response, "content", "") or "").strip().lower()
+    if not content:
+        return True
+    return any(marker in content for marker in LOW_CONFIDENCE_MARKERS)
+
+
+def estimate_cost(model_name: str, usage: Optional[Dict[str, Any]]) -> float:
+    """Estimates USD cost of a call from token usage and Config.MODEL_PRICING"""
+    if not usage:
+        return 0.0
+    input_price, output_price = Config.MODEL_PRICING.get(model_name, (0.0, 0.0))
+    input_tokens = usage.get("input_tokens", 0) or 0
+    output_tokens = usage.get("output_tokens", 0) or 0
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+@dataclass
+class RouteStats:
+    """Aggregated counters for one route"""
+    calls: int = 0
+    escalations: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+
+
+class RoutingMetrics:
+    """Thread-safe per-route latency and cost accounting"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, RouteStats] = {}
+
+    def record(
+        self,
+        route: str,
+        latency: float,
+        usage: Optional[Dict[str, Any]],
+        cost: float,
+        escalated: bool = False,
+    ) -> None:
+        with self._lock:
+            stats = self._routes.setdefault(route, RouteStats())
+            stats.calls += 1
+            stats.escalations += int(escalated)
+            stats.total_latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
+            if usage:
+                stats.input_tokens += usage.get("input_tokens", 0) or 0
+                stats.output_tokens += usage.get("output_tokens", 0) or 0
+            stats.cost_usd += cost
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for route, stats in self._routes.items():
+                data = asdict(stats)
+                data["avg_latency"] = stats.total_latency / stats.calls if stats.calls else 0.0
+                result[route] = data
+            return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+routing_metrics = RoutingMetrics()
+
+
+class ModelRouter:
+    """Routes each agent call to a fast or strong model and escalates weak answers.
+
+    ``models`` maps a tier name to any object with ``invoke(messages, temperature=..., **kwargs)``
+    and an optional ``model_name`` attribute, so routing can be exercised offline
+    with stubbed models.
+    """
+
+    def __init__(
+        self,
+        models: Optional[Dict[str, Any]] = None,
+        classifier: Callable[[str], str] = classify_turn,
+        metrics: Optional[RoutingMetrics] = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self._models = models or {}
+        self.classifier = classifier
+        self.metrics = metrics or routing_metrics
+        self.clock = clock
+        # Once a turn escalates, its follow-up calls (after tool results) stay on the strong tier
+        self._escalated = False
+
+    def _model(self, tier: str) -> Any:
+        if tier not in self._models:
+            from .agent import get_llm
+
+            model_name = Config.GEMINI_FAST_MODEL if tier == TIER_FAST else Config.GEMINI_STRONG_MODEL
+            self._models[tier] = get_llm(model_name)
+        return self._models[tier]
+
+    def _call(self, tier: str, route: str, messages: List[Any], escalated: bool = False, **kwargs: Any) -> Any:
+        model = self._model(tier)
+        temperature = Config.ROUTE_TEMPERATURES.get(route)
+        started = self.clock()
+        response = model.invoke(messages, temperature=temperature, **kwargs)
+        latency = self.clock() - started
+
+        usage = getattr(response, "usage_metadata", None)
+        model_name = getattr(model, "model_name", tier)
+        cost = estimate_cost(model_name, usage)
+        self.metrics.record(route, latency, usage, cost, escalated=escalated)
+        print(f"[ModelRouter] route={route} tier={tier} model={model_name} latency={latency:.2f}s cost=${cost:.6f}")
+        return response
+
+    def invoke(self, messages: List[Any], timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """Invokes the routed model; ``timeout`` bounds the call including any escalation"""
+        route = self.classifier(last_user_text(messages))
+        tier = TIER_STRONG if self._escalated else ROUTE_TIERS.get(route, TIER_STRONG)
+
+        started = self.clock()
+        response = self._call(tier, route, messages, timeout=timeout, **kwargs)
+        if tier == TIER_FAST and is_low_confidence(response):
+            remaining = None if timeout is None else timeout - (self.clock() - started)
+            if remaining is not None and remaining < Config.MIN_CALL_TIMEOUT:
+                print(f"[ModelRouter] Not escalating {route} turn: {remaining:.1f}s left")
+                return response
+            print(f"[ModelRouter] Escalating {route} turn to strong model")
+            self._escalated = True
+            response = self._call(TIER_STRONG, route, messages, escalated=True, timeout=remaining, **kwargs)
+        return response
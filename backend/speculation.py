@@ -0,0 +1,160 @@
+import contextvars
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Optional, Set
+
+from .config import Config
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Shared worker pool for speculative requests, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=Config.SPECULATIVE_WORKERS,
+                thread_name_prefix="exa-speculative",
+            )
+        return _executor
+
+
+def _tokens(text: str) -> Set[str]:
+    return set(re.findall(r"\w+", (text or "").lower()))
+
+
+def query_similarity(left: str, right: str) -> float:
+    """Jaccard similarity of the word sets of two queries"""
+    left_tokens, right_tokens = _tokens(left), _tokens(right)
+    if not left_tokens or not right_tokens:
+        return 0.0
+    return len(left_tokens & right_tokens) / len(left_tokens | right_tokens)
+
+
+@dataclass
+class SpeculationStats:
+    """Counters for speculative research outcomes"""
+    started: int = 0
+    hits: int = 0
+    misses: int = 0
+    unused: int = 0
+    saved_seconds: float = 0.0
+
+
+class SpeculationMetrics:
+    """Thread-safe aggregate of speculation hit rate and wall-clock saved"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = SpeculationStats()
+
+    def record(self, outcome: str, saved: float = 0.0) -> None:
+        with self._lock:
+            setattr(self._stats, outcome, getattr(self._stats, outcome) + 1)
+            self._stats.saved_seconds += saved
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            data = asdict(self._stats)
+            resolved = self._stats.hits + self._stats.misses + self._stats.unused
+            data["hit_rate"] = self._stats.hits / resolved if resolved else 0.0
+            return data
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = SpeculationStats()
+
+
+speculation_metrics = SpeculationMetrics()
+
+
+class SpeculativeResearch:
+    """Starts an Exa request for the user's question while the first LLM call runs.
+
+    If the model then asks ``exa_researcher`` for a sufficiently similar query,
+    the in-flight result is reused; otherwise the speculative request is cancelled.
+    A request that is already on the wire cannot be aborted, so its response is
+    simply discarded.
+    """
+
+    def __init__(
+        self,
+        researcher: Any,
+        should_speculate: Optional[Callable[[str], bool]] = None,
+        metrics: Optional[SpeculationMetrics] = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        from .tools import is_search_query
+
+        self.researcher = researcher
+        self.should_speculate = should_speculate or is_search_query
+        self.metrics = metrics or speculation_metrics
+        self.executor = executor
+        self.clock = clock
+        self._query: Optional[str] = None
+        self._future: Optional[Future] = None
+
+    def _run(self, query: str, timeout: Optional[float]):
+        started = self.clock()
+        result = self.researcher.research(query=query, timeout=timeout)
+        return result, self.clock() - started
+
+    def start(self, query: str, timeout: Optional[float] = None) -> bool:
+        """Launches a speculative request if the heuristic says the question needs the web"""
+        if self._future is not None or not self.should_speculate(query):
+            return False
+        executor = self.executor or get_executor()
+        self._query = query
+        # Run in the caller's context so cassette entries keep the turn's session
+        self._future = executor.submit(contextvars.copy_context().run, self._run, query, timeout)
+        self.metrics.record("started")
+        print(f"[SpeculativeResearch] Started speculative Exa request: {query[:100]}")
+        return True
+
+    def take(self, query: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Returns the speculative result if it answers ``query``, otherwise cancels it.
+
+        Waits at most ``timeout`` seconds for the in-flight request.
+        """
+        if self._future is None:
+            return None
+
+        from .tools import is_search_query
+
+        similarity = query_similarity(self._query, query)
+        # A non-search query would be sent with page context, so its answer would differ
+        if similarity < Config.SPECULATIVE_MATCH_THRESHOLD or not is_search_query(query):
+            print(f"[SpeculativeResearch] Miss (similarity={similarity:.2f}) for query: {query[:100]}")
+            self._cancel("misses")
+            return None
+
+        future = self._future
+        self._future = None
+        waited_from = self.clock()
+        try:
+            result, elapsed = future.result(timeout=timeout)
+        except Exception as exc:
+            print(f"[SpeculativeResearch] Speculative request failed: {exc}")
+            self.metrics.record("misses")
+            return None
+        saved = max(0.0, elapsed - (self.clock() - waited_from))
+        self.metrics.record("hits", saved)
+        print(f"[SpeculativeResearch] Hit (similarity={similarity:.2f}), saved {saved:.2f}s")
+        return result
+
+    def discard(self) -> None:
+        """Cancels a speculative request the model never asked for"""
+        if self._future is not None:
+            self._cancel("unused")
+
+    def _cancel(self, outcome: str) -> None:
+        self._future.cancel()
+        self._future = None
+        self.metrics.record(outcome)
@@ -1,16 +1,29 @@
 import json
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import requests
 from langchain_core.tools import BaseTool
 from pydantic import ConfigDict
 
+from .cassette import ReplayedHTTPResponse, get_cassette
 from .config import Config
 
 
 EXA_ANSWER_URL = "https://api.exa.ai/answer"
 MAX_CONTEXT_CHARS = 4000
 
+# Keywords that indicate searching for alternatives/similar items
+SEARCH_KEYWORDS = [
+    "аналогичные", "аналогичных", "похожие", "похожих", "другие", "альтернативы", "альтернатив",
+    "similar", "alternatives", "other", "like", "such as", "comparable"
+]
+
+
+def is_search_query(query: str) -> bool:
+    """Check whether the query asks for alternatives rather than page-specific facts"""
+    lowered = (query or "").lower()
+    return any(keyword in lowered for keyword in SEARCH_KEYWORDS)
+
 
 class ExaResearcher(BaseTool):
     """Tool for research using the Exa API"""
@@ -35,26 +48,22 @@ class ExaResearcher(BaseTool):
     def _run(self, query: str, context: str = "") -> str:
         return self.research(query, context)
 
-    def research(self, query: str, context: str = "") -> str:
-        if not Config.EXA_API_KEY:
+    def research(self, query: str, context: str = "", timeout: Optional[float] = None) -> str:
+        cassette = get_cassette()
+        if not Config.EXA_API_KEY and not (cassette and cassette.replaying):
             return "EXA API key is missing — set EXA_API_KEY in your environment."
 
         clean_query = (query or "").strip()
         if not clean_query:
             return "EXA search: пустой запрос."
 
-        # Keywords that indicate searching for alternatives/similar items
-        search_keywords = [
-            "аналогичные", "аналогичных", "похожие", "похожих", "другие", "альтернативы", "альтернатив",
-            "similar", "alternatives", "other", "like", "such as", "comparable"
-        ]
-        is_search_query = any(keyword in clean_query.lower() for keyword in search_keywords)
+        search_query = is_search_query(clean_query)
 
         context_snippet = (context or "").strip()
-        if context_snippet and not is_search_query:
+        if context_snippet and not search_query:
             context_snippet = context_snippet[:MAX_CONTEXT_CHARS]
             clean_query = f"{clean_query}\n\nContext:\n{context_snippet}"
-        elif is_search_query:
+        elif search_query:
             print(f"[ExaResearcher] Skipping context for search query: {clean_query[:100]}...")
         else:
             print(f"[ExaResearcher] No context provided or using it: context len={len(context_snippet)}")
@@ -67,7 +76,16 @@ class ExaResearcher(BaseTool):
 
         print(f"[ExaResearcher] Sending payload: {json.dumps(payload, ensure_ascii=False)}")
         try:
-            response = self._session.post(EXA_ANSWER_URL, data=json.dumps(payload), timeout=40)
+            if cassette:
+                response = cassette.call(
+                    "exa",
+                    {"url": EXA_ANSWER_URL, "payload": payload},
+                    perform=lambda: self._session.post(EXA_ANSWER_URL, data=json.dumps(payload), timeout=timeout or Config.EXA_TIMEOUT),
+                    encode=lambda result: {"status_code": result.status_code, "text": result.text},
+                    decode=lambda recorded: ReplayedHTTPResponse(recorded["status_code"], recorded["text"]),
+                )
+            else:
+                response = self._session.post(EXA_ANSWER_URL, data=json.dumps(payload), timeout=timeout or Config.EXA_TIMEOUT)
             print(f"[ExaResearcher] Response status: {response.status_code}")
         except requests.RequestException as exc:
             print(f"[ExaResearcher] Request failed: {exc}")
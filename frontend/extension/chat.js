@@ -10,6 +10,9 @@ if (!sessionId) {
   localStorage.setItem('aiAssistantSessionId', sessionId);
 }
 
+// Тела запросов больше этого размера отправляются сжатыми gzip
+const COMPRESSION_MIN_BYTES = 1024;
+
 // Состояние для контроля аудио
 let isPlayingAudio = false;
 let audioController = null;
@@ -117,6 +120,25 @@ async function getPageContentFallback() {
   }
 }
 
+// Сериализует тело запроса и сжимает его gzip, если браузер поддерживает CompressionStream
+async function encodeRequestBody(payload) {
+  const json = JSON.stringify(payload);
+  const headers = { 'Content-Type': 'application/json' };
+
+  if (typeof CompressionStream === 'undefined' || json.length < COMPRESSION_MIN_BYTES) {
+    return { body: json, headers };
+  }
+
+  try {
+    const stream = new Blob([json]).stream().pipeThrough(new CompressionStream('gzip'));
+    const body = await new Response(stream).arrayBuffer();
+    return { body, headers: { ...headers, 'Content-Encoding': 'gzip' } };
+  } catch (error) {
+    console.warn('⚠️ Request compression failed, sending uncompressed:', error);
+    return { body: json, headers };
+  }
+}
+
 async function sendMessage() {
   const message = messageInput.value.trim();
   if (!message || sendButton.disabled) return;
@@ -128,16 +150,16 @@ async function sendMessage() {
   try {
     const pageContext = await getPageContent();
 
+    const { body, headers } = await encodeRequestBody({
+      message: message,
+      page_content: pageContext.summarized,
+      page_details: pageContext.details
+    });
+
     const response = await fetch(`http://localhost:8000/chat/${sessionId}`, {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json'
-      },
-      body: JSON.stringify({
-        message: message,
-        page_content: pageContext.summarized,
-        page_details: pageContext.details
-      })
+      headers,
+      body
     });
 
     if (!response.ok) {